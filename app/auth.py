@@ -1,5 +1,9 @@
 from datetime import timedelta
+from threading import Lock
+import math
+import time
 
+from cachetools import TLRUCache
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
@@ -7,19 +11,39 @@ from app.config import settings
 from app.db import get_db
 from app.schemas import Token, UserCreate, UserLogin, UserResponse
 from app.security import create_access_token, verify_token
-from app.services import authenticate_user, create_user, get_user
+from app.services import authenticate_user, create_user, get_auth_user
 from app.logger import logger
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
+# Revoked token ids (jti) mapped to their exp. Entries leave only by expiry, never by size-based
+# eviction, so a revoked token cannot become valid again before its exp; expired entries are purged
+# on the next insert, which bounds the cache by the logouts within one token lifetime.
+_REVOKED_TOKENS = TLRUCache(maxsize=math.inf, ttu=lambda _jti, exp, _now: exp, timer=time.time)
+_REVOKED_TOKENS_LOCK = Lock()
+
+
+def _is_revoked(token_data) -> bool:
+    if not token_data.jti:
+        return False
+    with _REVOKED_TOKENS_LOCK:
+        return token_data.jti in _REVOKED_TOKENS
+
+
+def _revoke(token_data):
+    if token_data.jti and token_data.exp:
+        with _REVOKED_TOKENS_LOCK:
+            _REVOKED_TOKENS[token_data.jti] = token_data.exp
+
+
+async def get_current_user(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db=Depends(get_db),
 ):
-    logger.info("Validating access token for protected endpoint")
+    logger.debug("Validating access token for protected endpoint")
     if not credentials:
         logger.warning("Auth failed: missing bearer token")
         raise HTTPException(
@@ -37,7 +61,15 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = get_user(db, token_data.user_id)
+    if _is_revoked(token_data):
+        logger.warning("Auth failed: revoked token for user_id=%s", token_data.user_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user = await get_auth_user(db, token_data.user_id)
     if not user:
         logger.warning("Auth failed: token user not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -47,25 +79,32 @@ def get_current_user(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Account deactivated")
 
     request.state.current_user = user
-    logger.info("Authenticated user_id=%s", user.user_id)
+    logger.debug("Authenticated user_id=%s", user.user_id)
     return user
 
 
+async def require_owner(customer_id: str, current_user=Depends(get_current_user)):
+    if customer_id != current_user.user_id:
+        logger.warning("Forbidden: user_id=%s accessing customer_id=%s", current_user.user_id, customer_id)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return current_user
+
+
 @router.post("/register", response_model=UserResponse, status_code=201)
-def register(payload: UserCreate, db=Depends(get_db)):
+async def register(payload: UserCreate, db=Depends(get_db)):
     logger.info("Register request for user_id=%s", payload.user_id)
-    return create_user(db, payload)
+    return await create_user(db, payload)
 
 
 @router.post("/login", response_model=Token)
-def login(payload: UserLogin, db=Depends(get_db)):
+async def login(payload: UserLogin, db=Depends(get_db)):
     if not payload.user_id and not payload.email:
         logger.warning("Login failed: neither user_id nor email provided")
         raise HTTPException(status_code=400, detail="Provide user_id or email")
 
     login_identity = payload.user_id if payload.user_id else payload.email
     logger.info("Login request for identity=%s", login_identity)
-    user = authenticate_user(db, payload.user_id, payload.email, payload.password)
+    user = await authenticate_user(db, payload.user_id, payload.email, payload.password)
     if not user:
         logger.warning("Login failed for identity=%s", login_identity)
         raise HTTPException(
@@ -80,3 +119,12 @@ def login(payload: UserLogin, db=Depends(get_db)):
     )
     logger.info("Login successful for user_id=%s", user.user_id)
     return Token(access_token=token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user=Depends(get_current_user),
+):
+    _revoke(verify_token(credentials.credentials))
+    logger.info("Logout for user_id=%s", current_user.user_id)
@@ -10,9 +10,15 @@ class Settings(BaseSettings):
     )
 
     database_url: str = Field(validation_alias=AliasChoices("DATABASE_URL", "database_url"))
+    DATABASE_READ_URL: str = ""
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    BCRYPT_ROUNDS: int = Field(default=12, ge=4, le=31)
+    PASSWORD_PEPPER: str = ""
+    AUTH_USER_CACHE_TTL: int = 30
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+    SLOW_QUERY_THRESHOLD_MS: int = 100
     LOG_LEVEL: str = "INFO"
     APP_NAME: str = Field(
         default="Payment API",
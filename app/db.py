@@ -1,33 +1,90 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 from app.config import settings
 from app.logger import logger
 from app.models import Base
 
-_engine_kwargs = {"pool_pre_ping": True}
-if settings.database_url.startswith("sqlite"):
-    _engine_kwargs["connect_args"] = {"check_same_thread": False}
-else:
-    _engine_kwargs["pool_size"] = 10
-    _engine_kwargs["max_overflow"] = 20
-    _engine_kwargs["pool_recycle"] = 1800
+# DATABASE_URL may name a sync driver (e.g. postgresql+psycopg2); map it onto the async one.
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = perf_counter()
+
+
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - context._query_start_time
+    if elapsed > settings.SLOW_QUERY_THRESHOLD_MS / 1000:
+        logger.warning("Slow query %.4fs: %s", elapsed, statement)
+
+
+def _create_engine(url: str):
+    database_url = make_url(url)
+    database_url = database_url.set(
+        drivername=_ASYNC_DRIVERS.get(database_url.get_backend_name(), database_url.drivername)
+    )
+
+    engine_kwargs = {"pool_pre_ping": True}
+    if database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:"):
+        # An in-memory SQLite database exists only inside its connection, so every session must share one.
+        engine_kwargs["poolclass"] = StaticPool
+    elif database_url.get_backend_name() != "sqlite":
+        engine_kwargs["pool_size"] = 10
+        engine_kwargs["max_overflow"] = 20
+        engine_kwargs["pool_recycle"] = 1800
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            engine_kwargs["connect_args"] = {
+                "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+            }
 
-engine = create_engine(settings.database_url, **_engine_kwargs)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(database_url, **engine_kwargs)
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _start_query_timer)
+        event.listen(async_engine.sync_engine, "after_cursor_execute", _log_slow_query)
+    return async_engine
 
 
-def init_db():
+engine = _create_engine(settings.database_url)
+# Read-only endpoints may be pointed at a replica; without DATABASE_READ_URL they share the primary engine.
+read_engine = _create_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else engine
+
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(
+    bind=read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+async def init_db():
     logger.info("Creating database tables if they do not exist")
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     logger.info("Database table check complete")
 
 
-def get_db():
+async def dispose_engines():
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+async def get_db():
     logger.debug("Opening new database session")
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        logger.debug("Closing database session")
-        db.close()
+    async with SessionLocal() as db:
+        try:
+            yield db
+        finally:
+            logger.debug("Closing database session")
+
+
+async def get_read_db():
+    logger.debug("Opening new read-only database session")
+    async with ReadSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            logger.debug("Closing read-only database session")
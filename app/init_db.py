@@ -0,0 +1,14 @@
+import asyncio
+
+from app.db import dispose_engines, init_db
+
+
+async def main():
+    try:
+        await init_db()
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,30 +1,50 @@
-from logging.handlers import RotatingFileHandler
+import atexit
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import logging
 from pathlib import Path
+import queue
 import sys
 
 from app.config import settings
 
 LOGS_DIR = Path("logs")
 LOGS_DIR.mkdir(exist_ok=True)
+LOG_LEVEL = getattr(logging, settings.LOG_LEVEL, logging.INFO)
+
+# Console and file I/O happen on the listener thread; request code only enqueues records.
+_listener = None
+_listener_running = False
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class ExtraFieldsFormatter(logging.Formatter):
+    """Appends fields passed through ``extra=`` to the line as key=value pairs."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in record.__dict__.items() if key not in _RECORD_ATTRS
+        )
+        return f"{message} | {fields}" if fields else message
 
 
 def setup_logger(name: str = "payment_api") -> logging.Logger:
+    global _listener
     logger = logging.getLogger(name)
     if logger.handlers:
         return logger
 
-    log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
-    logger.setLevel(log_level)
+    logger.setLevel(LOG_LEVEL)
     logger.propagate = False
 
-    formatter = logging.Formatter(
+    formatter = ExtraFieldsFormatter(
         fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level)
+    console_handler.setLevel(LOG_LEVEL)
     console_handler.setFormatter(formatter)
 
     file_handler = RotatingFileHandler(
@@ -33,17 +53,42 @@ def setup_logger(name: str = "payment_api") -> logging.Logger:
         backupCount=5,
         encoding="utf-8",
     )
-    file_handler.setLevel(log_level)
+    file_handler.setLevel(LOG_LEVEL)
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    start_log_listener()
 
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
-    logging.getLogger("passlib").setLevel(logging.WARNING)
+
+    if settings.ENVIRONMENT == "development" and LOG_LEVEL <= logging.DEBUG:
+        # Connection pool checkouts and returns go through the same queue, only when DEBUG would keep them.
+        pool_logger = logging.getLogger("sqlalchemy.pool")
+        pool_logger.setLevel(logging.DEBUG)
+        pool_logger.propagate = False
+        pool_logger.addHandler(queue_handler)
 
     return logger
 
 
+def start_log_listener():
+    global _listener_running
+    if _listener is not None and not _listener_running:
+        _listener.start()
+        _listener_running = True
+
+
+def stop_log_listener():
+    global _listener_running
+    if _listener is not None and _listener_running:
+        _listener.stop()
+        _listener_running = False
+
+
+atexit.register(stop_log_listener)
+
 logger = setup_logger()
@@ -1,29 +1,41 @@
+from contextlib import asynccontextmanager
+import logging
+import secrets
 from time import perf_counter
-from uuid import uuid4
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.auth import router as auth_router
 from app.config import settings
-from app.db import init_db
-from app.logger import logger, setup_logger
+from app.db import dispose_engines
+from app.logger import logger, start_log_listener, stop_log_listener
 from app.routes_orders import router as orders_router
 from app.routes_users import router as users_router
 from app.routes_wallet import router as wallet_router
+from app.schemas import ApiIndexResponse, HealthResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_log_listener()
+    logger.info("Starting service in %s", settings.ENVIRONMENT)
+    yield
+    await dispose_engines()
+    logger.info("Service stopped; database connections closed")
+    stop_log_listener()
 
-setup_logger()
 
 app = FastAPI(
     title="Payment API",
     description="Payment service with JWT auth, users, orders and wallet endpoints",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-origins = [origin.strip() for origin in settings.ALLOWED_ORIGINS.split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"] if settings.ENVIRONMENT == "development" else origins,
+    allow_origins=["*"] if settings.ENVIRONMENT == "development" else settings.allowed_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -32,10 +44,14 @@ app.add_middleware(
 
 @app.middleware("http")
 async def request_trace_middleware(request: Request, call_next):
-    request_id = uuid4().hex[:10]
+    request_id = secrets.token_hex(5)
     request.state.request_id = request_id
-    start = perf_counter()
+    if not logger.isEnabledFor(logging.INFO):
+        response = await call_next(request)
+        response.headers["X-Request-Id"] = request_id
+        return response
 
+    start = perf_counter()
     response = await call_next(request)
 
     elapsed = perf_counter() - start
@@ -44,19 +60,13 @@ async def request_trace_middleware(request: Request, call_next):
     return response
 
 
-@app.on_event("startup")
-def startup_event():
-    logger.info("Starting service in %s", settings.ENVIRONMENT)
-    init_db()
-
-
 app.include_router(auth_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
 app.include_router(orders_router, prefix="/api")
 app.include_router(wallet_router, prefix="/api")
 
 
-@app.get("/", tags=["health"])
+@app.get("/", tags=["health"], response_model=HealthResponse)
 def health_check():
     return {
         "status": "healthy",
@@ -65,12 +75,12 @@ def health_check():
     }
 
 
-@app.get("/api", tags=["meta"])
+@app.get("/api", tags=["meta"], response_model=ApiIndexResponse)
 def api_index():
     return {
         "name": "Payment API",
-        "auth": ["/api/auth/register", "/api/auth/login"],
+        "auth": ["/api/auth/register", "/api/auth/login", "/api/auth/logout"],
         "users": ["/api/users", "/api/users/{user_id}"],
-        "orders": ["/api/orders"],
+        "orders": ["/api/orders", "/api/orders/batch"],
         "wallet": ["/api/wallet/{customer_id}"],
     }
@@ -1,8 +1,10 @@
 from datetime import datetime, timezone
 import uuid
 
-from sqlalchemy import Boolean, CheckConstraint, Column, DateTime, ForeignKey, Numeric, String, Text
+from sqlalchemy import Boolean, CheckConstraint, Column, DateTime, ForeignKey, Index, Numeric, String, Text, Uuid, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.sql.functions import FunctionElement
 
 Base = declarative_base()
 
@@ -11,6 +13,24 @@ def utcnow():
     return datetime.now(timezone.utc)
 
 
+class gen_random_uuid(FunctionElement):
+    """Server-side random UUID default, matching sql/schema.sql."""
+
+    type = Uuid(as_uuid=False)
+    inherit_cache = True
+
+
+@compiles(gen_random_uuid, "postgresql")
+def _pg_gen_random_uuid(element, compiler, **kw):
+    return "gen_random_uuid()"
+
+
+@compiles(gen_random_uuid, "sqlite")
+def _sqlite_gen_random_uuid(element, compiler, **kw):
+    # SQLite stores Uuid as 32 hex characters and needs parentheses around expression defaults.
+    return "(lower(hex(randomblob(16))))"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -22,14 +42,21 @@ class User(Base):
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime(timezone=True), default=utcnow)
 
-    orders = relationship("Order", back_populates="user")
-    wallet = relationship("Wallet", back_populates="user", uselist=False)
+    orders = relationship("Order", back_populates="user", lazy="raise")
+    wallet = relationship("Wallet", back_populates="user", uselist=False, lazy="raise")
 
 
 class Order(Base):
     __tablename__ = "orders"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Native UUID on PostgreSQL (16 bytes); the server default covers raw inserts, the ORM still assigns ids.
+    # Values stay strings in Python.
+    id = Column(
+        Uuid(as_uuid=False),
+        primary_key=True,
+        default=lambda: str(uuid.uuid4()),
+        server_default=gen_random_uuid(),
+    )
     customer_id = Column(String(100), ForeignKey("users.user_id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     currency = Column(String(3), nullable=False, default="INR")
@@ -37,10 +64,18 @@ class Order(Base):
     status = Column(String(50), nullable=False, default="created")
     created_at = Column(DateTime(timezone=True), default=utcnow)
 
-    user = relationship("User", back_populates="orders")
+    user = relationship("User", back_populates="orders", lazy="raise")
 
     __table_args__ = (
         CheckConstraint("amount > 0", name="check_order_amount_positive"),
+        Index("idx_orders_customer_id", "customer_id"),
+        Index(
+            "idx_orders_idempotency_key",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+            sqlite_where=text("idempotency_key IS NOT NULL"),
+        ),
     )
 
 
@@ -48,10 +83,10 @@ class Wallet(Base):
     __tablename__ = "wallets"
 
     customer_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
-    balance = Column(Numeric(10, 2), nullable=False, default=0)
+    balance = Column(Numeric(18, 2), nullable=False, default=0)
     updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
 
-    user = relationship("User", back_populates="wallet")
+    user = relationship("User", back_populates="wallet", lazy="raise")
 
     __table_args__ = (
         CheckConstraint("balance >= 0", name="check_wallet_balance_non_negative"),
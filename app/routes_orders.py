@@ -1,24 +1,23 @@
 from typing import List
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import services
-from app.auth import get_current_user
+from app.auth import get_current_user, require_owner
 from app.config import settings
-from app.db import get_db
-from app.models import User
-from app.schemas import OrderCreate, OrderDetail, OrderResponse
+from app.db import get_db, get_read_db
+from app.schemas import OrderBatchCreate, OrderCreate, OrderDetail, OrderResponse
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
 @router.post("", response_model=OrderResponse, status_code=201)
-def create_order_endpoint(
+async def create_order_endpoint(
     payload: OrderCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: services.AuthUser = Depends(get_current_user),
 ):
     if payload.customer_id != current_user.user_id:
         raise HTTPException(
@@ -26,7 +25,7 @@ def create_order_endpoint(
             detail="Not authorized to create orders for this customer",
         )
 
-    order = services.create_order(db, payload)
+    order = await services.create_order(db, payload)
 
     if settings.transaction_settlement_window > 0:
         background_tasks.add_task(
@@ -38,16 +37,38 @@ def create_order_endpoint(
     return OrderResponse(order_id=order.id, status=order.status)
 
 
-@router.get("", response_model=List[OrderDetail])
-def list_orders_endpoint(
-    customer_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+@router.post("/batch", response_model=List[OrderResponse], status_code=201)
+async def create_order_batch_endpoint(
+    payload: OrderBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: services.AuthUser = Depends(get_current_user),
 ):
-    if customer_id != current_user.user_id:
+    if any(order.customer_id != current_user.user_id for order in payload.orders):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view orders for this customer",
+            detail="Not authorized to create orders for this customer",
         )
 
-    return services.get_orders_by_customer(db, customer_id)
+    orders = await services.create_orders(db, payload.orders)
+
+    if settings.transaction_settlement_window > 0:
+        for order in orders:
+            background_tasks.add_task(
+                services.handle_settlement_window,
+                order_id=order.id,
+                window_seconds=settings.transaction_settlement_window,
+            )
+
+    return [OrderResponse(order_id=order.id, status=order.status) for order in orders]
+
+
+@router.get("", response_model=List[OrderDetail])
+async def list_orders_endpoint(
+    customer_id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: services.AuthUser = Depends(require_owner),
+):
+    return await services.get_orders_by_customer(db, customer_id, skip=skip, limit=limit)
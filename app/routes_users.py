@@ -1,32 +1,31 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
-from app.db import get_db
-from app.models import User
+from app.db import get_db, get_read_db
 from app.schemas import UserCreate, UserDetail, UserResponse
-from app.services import create_user, get_user, list_users
+from app.services import AuthUser, create_user, get_user, list_users
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("", response_model=UserResponse, status_code=201)
-def create_user_endpoint(payload: UserCreate, db: Session = Depends(get_db)):
-    return create_user(db, payload)
+async def create_user_endpoint(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    return await create_user(db, payload)
 
 
 @router.get("/{user_id}", response_model=UserDetail)
-def get_user_endpoint(
+async def get_user_endpoint(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_user),
 ):
     if current_user.user_id != user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
-    user = get_user(db, user_id)
+    user = await get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -34,10 +33,10 @@ def get_user_endpoint(
 
 
 @router.get("", response_model=List[UserDetail])
-def list_users_endpoint(
+async def list_users_endpoint(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_user),
 ):
-    return list_users(db, skip=skip, limit=limit)
+    return await list_users(db, skip=skip, limit=limit)
@@ -1,7 +1,11 @@
 from datetime import datetime
-from typing import Optional
+from decimal import Decimal
+from typing import Annotated, List, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, PlainSerializer
+
+# Balances stay Decimal from the Numeric column through validation and are only turned into a JSON number on output.
+Money = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
 
 
 class UserBase(BaseModel):
@@ -54,6 +58,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: Optional[str] = None
+    exp: Optional[int] = None
+    jti: Optional[str] = None
 
 
 class OrderCreate(BaseModel):
@@ -68,6 +74,10 @@ class OrderResponse(BaseModel):
     status: str
 
 
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=100)
+
+
 class OrderDetail(BaseModel):
     id: str
     customer_id: str
@@ -82,12 +92,12 @@ class OrderDetail(BaseModel):
 
 
 class WalletOperation(BaseModel):
-    amount: float = Field(..., gt=0, le=100000)
+    amount: Decimal = Field(..., gt=0, le=100000, decimal_places=2)
 
 
 class WalletResponse(BaseModel):
     customer_id: str
-    balance: float
+    balance: Money
 
     class Config:
         from_attributes = True
@@ -95,8 +105,22 @@ class WalletResponse(BaseModel):
 
 class WalletDetail(BaseModel):
     customer_id: str
-    balance: float
+    balance: Money
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class HealthResponse(BaseModel):
+    status: str
+    service: str
+    environment: str
+
+
+class ApiIndexResponse(BaseModel):
+    name: str
+    auth: List[str]
+    users: List[str]
+    orders: List[str]
+    wallet: List[str]
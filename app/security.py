@@ -1,24 +1,90 @@
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from threading import RLock
+import time
 from typing import Optional
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import bcrypt
+from cachetools import TLRUCache
+import jwt
+from jwt.utils import base64url_encode
 
 from app.config import settings
 from app.schemas import TokenData
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Checked against when a login names an unknown user, so response time does not reveal which ids exist.
+DUMMY_PASSWORD_HASH = bcrypt.hashpw(
+    secrets.token_bytes(16), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+).decode("utf-8")
+
+# bcrypt releases the GIL, so a thread per core hashes in parallel without blocking the event loop.
+_password_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
+
+# Verified access tokens keyed by a 16-byte digest of the token; each entry lives until the token's exp.
+_token_cache = TLRUCache(maxsize=10_000, ttu=lambda _key, token_data, _now: token_data.exp, timer=time.time)
+_token_cache_lock = RLock()
+
+
+# Tokens are signed with the shared SECRET_KEY, which only makes sense for the HMAC family.
+_HMAC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+
+
+def _load_jwt_signer(algorithm: str, secret_key: str):
+    if algorithm not in _HMAC_ALGORITHMS:
+        raise ValueError(f"ALGORITHM must be one of {sorted(_HMAC_ALGORITHMS)}, got {algorithm!r}")
+    jwt_algorithm = jwt.get_algorithm_by_name(algorithm)
+    return jwt_algorithm, jwt_algorithm.prepare_key(secret_key)
+
+
+# The JWT header and prepared signing key never change, so token issuance only encodes and signs the claims.
+_jwt_algorithm, _jwt_signing_key = _load_jwt_signer(settings.ALGORITHM, settings.SECRET_KEY)
+_jwt_header_segment = base64url_encode(
+    json.dumps({"alg": settings.ALGORITHM, "typ": "JWT"}, separators=(",", ":"), sort_keys=True).encode("utf-8")
+)
+
+
+def _password_bytes(password: str) -> bytes:
+    if not settings.PASSWORD_PEPPER:
+        return password.encode("utf-8")
+    digest = hmac.new(settings.PASSWORD_PEPPER.encode("utf-8"), password.encode("utf-8"), hashlib.sha256)
+    return base64.b64encode(digest.digest())
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode("utf-8"))
     except Exception:
         return False
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode("utf-8")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<rounds>$<salt+digest>
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -26,14 +92,32 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     payload = dict(data)
-    payload.update({"exp": expire_at, "type": "access"})
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    payload.update({"exp": int(expire_at.timestamp()), "type": "access", "jti": secrets.token_hex(16)})
+    signing_input = b".".join(
+        (_jwt_header_segment, base64url_encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")))
+    )
+    signature = _jwt_algorithm.sign(signing_input, _jwt_signing_key)
+    return b".".join((signing_input, base64url_encode(signature))).decode("ascii")
 
 
 def verify_token(token: str) -> Optional[TokenData]:
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    with _token_cache_lock:
+        token_data = _token_cache.get(cache_key)
+    if token_data is not None:
+        return token_data
+
+    token_data = _decode_token(token)
+    if token_data and token_data.exp:
+        with _token_cache_lock:
+            _token_cache[cache_key] = token_data
+    return token_data
+
+
+def _decode_token(token: str) -> Optional[TokenData]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    except JWTError:
+    except jwt.InvalidTokenError:
         return None
 
     if payload.get("type") != "access":
@@ -43,4 +127,4 @@ def verify_token(token: str) -> Optional[TokenData]:
     if not user_id:
         return None
 
-    return TokenData(user_id=user_id)
+    return TokenData(user_id=user_id, exp=payload.get("exp"), jti=payload.get("jti"))
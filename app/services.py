@@ -1,215 +1,323 @@
 import asyncio
 from datetime import datetime, timezone
+from decimal import Decimal
+from threading import Lock
+from typing import NamedTuple
 import uuid
 
+from cachetools import TTLCache
 from fastapi import HTTPException
-from sqlalchemy import or_
+from sqlalchemy import lambda_stmt, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 
+from app.config import settings
 from app.logger import logger
 from app.models import Order, User, Wallet
-from app.security import get_password_hash, verify_password
+from app.security import (
+    DUMMY_PASSWORD_HASH,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
+)
 
 
-def _utc_now():
-    return datetime.now(timezone.utc).isoformat()
+class AuthUser(NamedTuple):
+    user_id: str
+    is_active: bool
 
 
-def create_user(db, payload):
-    logger.info("Creating user: user_id=%s email=%s", payload.user_id, payload.email)
-    existing = (
-        db.query(User)
-        .filter(or_(User.user_id == payload.user_id, User.email == payload.email))
-        .first()
-    )
-    if existing:
-        logger.warning("User create blocked: duplicate user_id/email")
-        raise HTTPException(status_code=400, detail="User already exists")
+_auth_user_cache = TTLCache(maxsize=10_000, ttl=settings.AUTH_USER_CACHE_TTL)
+_auth_user_cache_lock = Lock()
+
+
+def invalidate_auth_user(user_id):
+    with _auth_user_cache_lock:
+        _auth_user_cache.pop(user_id, None)
+
 
-    row = User(
-        user_id=payload.user_id,
-        email=payload.email,
-        full_name=payload.full_name,
-        phone=payload.phone,
-        hashed_password=get_password_hash(payload.password),
-        is_active=True,
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _dialect_insert(db, model):
+    return _DIALECT_INSERTS[db.bind.dialect.name](model)
+
+
+async def create_user(db, payload):
+    logger.info("Creating user: user_id=%s email=%s", payload.user_id, payload.email)
+    stmt = (
+        _dialect_insert(db, User)
+        .values(
+            user_id=payload.user_id,
+            email=payload.email,
+            full_name=payload.full_name,
+            phone=payload.phone,
+            hashed_password=await get_password_hash_async(payload.password),
+            is_active=True,
+        )
+        .on_conflict_do_nothing()
+        .returning(User)
     )
 
     try:
-        db.add(row)
-        db.commit()
-        db.refresh(row)
+        row = await db.scalar(stmt)
+        if row is None:
+            await db.rollback()
+            logger.warning("User create blocked: duplicate user_id/email")
+            raise HTTPException(status_code=400, detail="User already exists")
+        await db.commit()
+        invalidate_auth_user(row.user_id)
         logger.info("User created successfully: user_id=%s", row.user_id)
         return row
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         logger.exception("Database integrity error while creating user")
         raise HTTPException(status_code=400, detail="User already exists")
 
 
-def authenticate_user(db, user_id, email, password):
+async def authenticate_user(db, user_id, email, password):
     if not user_id and not email:
         logger.warning("Authenticate failed: no user_id/email provided")
         return None
 
-    query = db.query(User)
+    query = select(User)
     if user_id and email:
-        user = query.filter(or_(User.user_id == user_id, User.email == email)).first()
+        query = query.where(or_(User.user_id == user_id, User.email == email))
     elif user_id:
-        user = query.filter(User.user_id == user_id).first()
+        query = query.where(User.user_id == user_id)
     else:
-        user = query.filter(User.email == email).first()
+        query = query.where(User.email == email)
+    user = await db.scalar(query.limit(1))
 
-    if not user or not user.is_active:
+    if not user:
+        await verify_password_async(password, DUMMY_PASSWORD_HASH)
         logger.warning("Authenticate failed: user not found or inactive")
         return None
 
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         logger.warning("Authenticate failed: password mismatch")
         return None
 
+    if not user.is_active:
+        logger.warning("Authenticate failed: user not found or inactive")
+        return None
+
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        await db.commit()
+        logger.info("Password hash upgraded to current cost: user_id=%s", user.user_id)
+
     logger.info("Authenticate success: user_id=%s", user.user_id)
     return user
 
 
-def get_user(db, user_id):
-    return db.query(User).filter(User.user_id == user_id).first()
+async def get_user(db, user_id):
+    return await db.get(User, user_id)
 
 
-def list_users(db, skip=0, limit=100):
-    return db.query(User).offset(skip).limit(limit).all()
+async def get_auth_user(db, user_id):
+    with _auth_user_cache_lock:
+        cached = _auth_user_cache.get(user_id)
+    if cached is not None:
+        return cached
 
+    user = await get_user(db, user_id)
+    if not user:
+        return None
 
-def create_order(db, payload):
-    logger.info("Creating order: customer_id=%s amount=%s", payload.customer_id, payload.amount)
-    if payload.idempotency_key:
-        existing = db.query(Order).filter(Order.idempotency_key == payload.idempotency_key).first()
-        if existing:
-            logger.info("Order idempotency hit: key=%s order_id=%s", payload.idempotency_key, existing.id)
-            return existing
+    snapshot = AuthUser(user_id=user.user_id, is_active=user.is_active)
+    with _auth_user_cache_lock:
+        _auth_user_cache[user_id] = snapshot
+    return snapshot
+
+
+async def list_users(db, skip=0, limit=100):
+    result = await db.scalars(select(User).offset(skip).limit(limit))
+    return result.all()
 
-    row = Order(
-        id=str(uuid.uuid4()),
+
+async def create_order(db, payload):
+    logger.info("Creating order: customer_id=%s amount=%s", payload.customer_id, payload.amount)
+    values = dict(
         customer_id=payload.customer_id,
         amount=payload.amount,
         currency=payload.currency,
         idempotency_key=payload.idempotency_key,
         status="created",
     )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
+    stmt = _dialect_insert(db, Order).values(**values)
+    if payload.idempotency_key:
+        # The partial unique index turns a replayed key into a no-op instead of a second order.
+        stmt = stmt.on_conflict_do_nothing(
+            index_elements=[Order.idempotency_key],
+            index_where=Order.idempotency_key.is_not(None),
+        )
+
+    row = await db.scalar(stmt.returning(Order))
+    if row is None:
+        await db.rollback()
+        existing = await db.scalar(select(Order).where(Order.idempotency_key == payload.idempotency_key).limit(1))
+        logger.info("Order idempotency hit: key=%s order_id=%s", payload.idempotency_key, existing.id)
+        return existing
+
+    await db.commit()
     logger.info("Order created: order_id=%s", row.id)
     return row
 
 
+async def create_orders(db, payloads):
+    logger.info("Creating order batch: size=%d", len(payloads))
+    # Ids are assigned here so the RETURNING rows can be put back in request order.
+    rows = [
+        dict(
+            id=str(uuid.uuid4()),
+            customer_id=payload.customer_id,
+            amount=payload.amount,
+            currency=payload.currency,
+            idempotency_key=payload.idempotency_key,
+            status="created",
+        )
+        for payload in payloads
+    ]
+    stmt = (
+        _dialect_insert(db, Order)
+        .values(rows)
+        .on_conflict_do_nothing(
+            index_elements=[Order.idempotency_key],
+            index_where=Order.idempotency_key.is_not(None),
+        )
+        .returning(Order)
+    )
+    created = {order.id: order for order in (await db.scalars(stmt)).all()}
+
+    replayed = {}
+    replayed_keys = [row["idempotency_key"] for row in rows if row["id"] not in created]
+    if replayed_keys:
+        existing = await db.scalars(select(Order).where(Order.idempotency_key.in_(replayed_keys)))
+        replayed = {order.idempotency_key: order for order in existing.all()}
+        logger.info("Order batch idempotency hits: %d", len(replayed_keys))
+
+    await db.commit()
+    logger.info("Order batch created: inserted=%d", len(created))
+    return [created.get(row["id"]) or replayed[row["idempotency_key"]] for row in rows]
+
+
 async def handle_settlement_window(order_id, window_seconds):
     logger.info("Settlement window started for order_id=%s", order_id)
-    elapsed = 0.0
-    while elapsed < window_seconds:
-        await asyncio.sleep(0.5)
-        elapsed += 0.5
+    # One timer for the whole window instead of waking every 500ms.
+    await asyncio.sleep(window_seconds)
     logger.info("Settlement window completed for order_id=%s", order_id)
 
 
-def get_orders_by_customer(db, customer_id):
-    return (
-        db.query(Order)
-        .filter(Order.customer_id == customer_id)
-        .order_by(Order.created_at.desc())
-        .all()
+async def get_orders_by_customer(db, customer_id, skip=0, limit=100):
+    # Plain column rows skip ORM identity-map bookkeeping; OrderDetail validates the mappings directly.
+    # lambda_stmt caches the built statement by call site, so only customer_id, skip and limit are re-bound per call.
+    result = await db.execute(
+        lambda_stmt(
+            lambda: select(
+                Order.id,
+                Order.customer_id,
+                Order.amount,
+                Order.currency,
+                Order.status,
+                Order.idempotency_key,
+                Order.created_at,
+            )
+            .where(Order.customer_id == customer_id)
+            .order_by(Order.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
     )
+    orders = result.mappings().all()
+    logger.debug("Fetched %d orders: customer_id=%s skip=%s limit=%s", len(orders), customer_id, skip, limit)
+    return orders
 
 
-def get_wallet(db, customer_id):
+async def get_wallet(db, customer_id):
     logger.info("Fetching wallet: customer_id=%s", customer_id)
-    wallet = db.query(Wallet).filter(Wallet.customer_id == customer_id).first()
+    wallet = await db.get(Wallet, customer_id)
     if wallet:
         logger.info("Wallet found: customer_id=%s", customer_id)
         return wallet
 
-    wallet = Wallet(customer_id=customer_id, balance=0)
+    wallet = Wallet(customer_id=customer_id, balance=Decimal("0"))
     db.add(wallet)
-    db.commit()
-    db.refresh(wallet)
+    await db.commit()
+    await db.refresh(wallet)
     logger.info("Wallet auto-created: customer_id=%s", customer_id)
     return wallet
 
 
-def credit_wallet(db, customer_id, amount):
+async def credit_wallet(db, customer_id, amount):
     logger.info("Credit wallet request: customer_id=%s amount=%s", customer_id, amount)
-    try:
-        wallet = (
-            db.query(Wallet)
-            .filter(Wallet.customer_id == customer_id)
-            .with_for_update()
-            .first()
+    now = datetime.now(timezone.utc)
+    stmt = (
+        _dialect_insert(db, Wallet)
+        .values(customer_id=customer_id, balance=amount, updated_at=now)
+        .on_conflict_do_update(
+            index_elements=[Wallet.customer_id],
+            set_={"balance": Wallet.balance + amount, "updated_at": now},
         )
-
-        if not wallet:
-            wallet = Wallet(customer_id=customer_id, balance=0)
-            db.add(wallet)
-
-        wallet.balance = float(wallet.balance) + amount
-        wallet.updated_at = datetime.now(timezone.utc)
+        .returning(Wallet)
+        .execution_options(populate_existing=True)
+    )
+    try:
+        wallet = await db.scalar(stmt)
 
         logger.info(
-            "AUDIT wallet_credit customer_id=%s amount=%s balance=%s at=%s",
-            customer_id,
-            amount,
-            wallet.balance,
-            _utc_now(),
+            "AUDIT",
+            extra={
+                "event": "wallet_credit",
+                "customer_id": customer_id,
+                "amount": amount,
+                "balance": wallet.balance,
+            },
         )
 
-        db.commit()
-        db.refresh(wallet)
+        await db.commit()
         logger.info("Credit wallet success: customer_id=%s balance=%s", customer_id, wallet.balance)
         return wallet
     except Exception:
-        db.rollback()
+        await db.rollback()
         logger.exception("Credit wallet failed: customer_id=%s", customer_id)
         raise
 
 
-def debit_wallet(db, customer_id, amount):
+async def debit_wallet(db, customer_id, amount):
     logger.info("Debit wallet request: customer_id=%s amount=%s", customer_id, amount)
-    wallet = (
-        db.query(Wallet)
-        .filter(Wallet.customer_id == customer_id)
-        .with_for_update()
-        .first()
+    stmt = (
+        update(Wallet)
+        .where(Wallet.customer_id == customer_id, Wallet.balance >= amount)
+        .values(balance=Wallet.balance - amount, updated_at=datetime.now(timezone.utc))
+        .returning(Wallet)
+        .execution_options(populate_existing=True)
     )
-    if not wallet:
-        wallet = Wallet(customer_id=customer_id, balance=0)
-        db.add(wallet)
-
-    current_balance = float(wallet.balance)
-    if current_balance < amount:
+    wallet = await db.scalar(stmt)
+    if wallet is None:
+        await db.rollback()
         logger.warning(
-            "Debit wallet blocked: insufficient balance customer_id=%s balance=%s amount=%s",
+            "Debit wallet blocked: insufficient balance customer_id=%s amount=%s",
             customer_id,
-            current_balance,
             amount,
         )
         raise ValueError("Insufficient wallet balance")
 
     try:
-        wallet.balance = current_balance - amount
-        wallet.updated_at = datetime.now(timezone.utc)
-
         logger.info(
-            "AUDIT wallet_debit customer_id=%s amount=%s balance=%s at=%s",
-            customer_id,
-            amount,
-            wallet.balance,
-            _utc_now(),
+            "AUDIT",
+            extra={
+                "event": "wallet_debit",
+                "customer_id": customer_id,
+                "amount": amount,
+                "balance": wallet.balance,
+            },
         )
 
-        db.commit()
-        db.refresh(wallet)
+        await db.commit()
         logger.info("Debit wallet success: customer_id=%s balance=%s", customer_id, wallet.balance)
         return wallet
     except Exception:
-        db.rollback()
+        await db.rollback()
         logger.exception("Debit wallet failed: customer_id=%s", customer_id)
         raise
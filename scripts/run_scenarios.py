@@ -7,6 +7,10 @@ from typing import Any, Dict, List
 
 import httpx
 
+# Enough keep-alive sockets for the concurrent wallet scenarios; connect failures are retried.
+HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+HTTP_RETRIES = 3
+
 
 class ScenarioRunner:
     def __init__(self, base_url: str, customer_id: str):
@@ -15,11 +19,17 @@ class ScenarioRunner:
         self.customer_id = customer_id
         self.email = f"{self.customer_id.lower()}@example.com"
         self.password = "password123"
+        self.wallet_path = f"/wallet/{self.customer_id}"
+        self.credit_path = f"{self.wallet_path}/credit"
+        self.debit_path = f"{self.wallet_path}/debit"
         self.client: httpx.AsyncClient | None = None
         self.auth_headers: Dict[str, str] = {}
 
     async def __aenter__(self):
-        self.client = httpx.AsyncClient()
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=httpx.AsyncHTTPTransport(limits=HTTP_LIMITS, retries=HTTP_RETRIES),
+        )
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -27,23 +37,14 @@ class ScenarioRunner:
             await self.client.aclose()
 
     def _json_or_text(self, response: httpx.Response) -> Any:
-        try:
+        if "application/json" in response.headers.get("content-type", ""):
             return response.json()
-        except ValueError:
-            return response.text
+        return response.text
 
     async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
         if not self.client:
             raise RuntimeError("HTTP client is not initialized")
-        headers = kwargs.pop("headers", {})
-        merged_headers = dict(self.auth_headers)
-        merged_headers.update(headers)
-        return await self.client.request(
-            method=method,
-            url=f"{self.base_url}{path}",
-            headers=merged_headers,
-            **kwargs
-        )
+        return await self.client.request(method, path, **kwargs)
     
     async def ensure_user(self):
         """Ensure user exists."""
@@ -86,12 +87,14 @@ class ScenarioRunner:
         if not token:
             raise RuntimeError("Login succeeded but no access token returned")
         self.auth_headers = {"Authorization": f"Bearer {token}"}
+        # Set once on the client so every later request carries it without a per-call copy.
+        self.client.headers.update(self.auth_headers)
     
     async def ensure_wallet(self):
         """Ensure wallet exists with initial balance."""
         await self.ensure_user()
         print(f"Ensuring wallet exists for {self.customer_id}...")
-        response = await self._request("GET", f"/wallet/{self.customer_id}", timeout=10.0)
+        response = await self._request("GET", self.wallet_path, timeout=10.0)
         if response.status_code == 200:
             data = response.json()
             print(f"Wallet balance: {data['balance']}")
@@ -99,14 +102,14 @@ class ScenarioRunner:
                 print("Topping up wallet...")
                 await self._request(
                     "POST",
-                    f"/wallet/{self.customer_id}/credit",
+                    self.credit_path,
                     json={"amount": 1000.0}
                 )
         elif response.status_code == 404:
             print("Creating wallet...")
             await self._request(
                 "POST",
-                f"/wallet/{self.customer_id}/credit",
+                self.credit_path,
                 json={"amount": 1000.0}
             )
     
@@ -172,13 +175,13 @@ class ScenarioRunner:
         print("\nSetting up wallet with known balance...")
         await self._request(
             "POST",
-            f"/wallet/{self.customer_id}/credit",
+            self.credit_path,
             json={"amount": 500.0}
         )
         
         await asyncio.sleep(0.5)
         
-        initial_response = await self._request("GET", f"/wallet/{self.customer_id}", timeout=10.0)
+        initial_response = await self._request("GET", self.wallet_path, timeout=10.0)
         initial_payload = self._json_or_text(initial_response)
         if initial_response.status_code != 200 or not isinstance(initial_payload, dict) or "balance" not in initial_payload:
             raise RuntimeError(f"Unable to fetch initial wallet balance: {initial_response.status_code} - {initial_payload}")
@@ -190,17 +193,15 @@ class ScenarioRunner:
         
         print(f"\nExecuting {num_operations} concurrent debits of {debit_amount} each...")
 
-        sem = asyncio.Semaphore(10)
-
+        # Every debit is in flight at once; the client's connection pool is the only cap.
         async def debit_operation(i):
             try:
-                async with sem:
-                    response = await self._request(
-                        "POST",
-                        f"/wallet/{self.customer_id}/debit",
-                        json={"amount": debit_amount}
-                    )
-                    return response.status_code == 200
+                response = await self._request(
+                    "POST",
+                    self.debit_path,
+                    json={"amount": debit_amount}
+                )
+                return response.status_code == 200
             except Exception:
                 return False
         
@@ -211,7 +212,7 @@ class ScenarioRunner:
         
         await asyncio.sleep(0.5)
         
-        final_response = await self._request("GET", f"/wallet/{self.customer_id}", timeout=10.0)
+        final_response = await self._request("GET", self.wallet_path, timeout=10.0)
         final_payload = self._json_or_text(final_response)
         if final_response.status_code != 200 or not isinstance(final_payload, dict) or "balance" not in final_payload:
             raise RuntimeError(f"Unable to fetch final wallet balance: {final_response.status_code} - {final_payload}")
@@ -279,13 +280,14 @@ class ScenarioRunner:
         ]
         
         random.shuffle(operations)
+        order_amounts = []
         
         for op_type, amount in operations:
             if op_type == "credit":
                 print(f"\nCrediting {amount}...")
                 await self._request(
                     "POST",
-                    f"/wallet/{self.customer_id}/credit",
+                    self.credit_path,
                     json={"amount": amount}
                 )
             elif op_type == "debit":
@@ -293,28 +295,31 @@ class ScenarioRunner:
                 try:
                     await self._request(
                         "POST",
-                        f"/wallet/{self.customer_id}/debit",
+                        self.debit_path,
                         json={"amount": amount}
                     )
                 except Exception:
                     pass
             elif op_type == "order":
-                print(f"\nCreating order for {amount}...")
-                await self._request(
-                    "POST",
-                    "/orders",
-                    json={
-                        "customer_id": self.customer_id,
-                        "amount": amount,
-                        "currency": "INR"
-                    },
-                    timeout=5.0
-                )
-            
-            await asyncio.sleep(0.2)
+                print(f"\nQueueing order for {amount}...")
+                order_amounts.append(amount)
+        
+        if order_amounts:
+            print(f"\nCreating {len(order_amounts)} orders in one batch...")
+            await self._request(
+                "POST",
+                "/orders/batch",
+                json={
+                    "orders": [
+                        {"customer_id": self.customer_id, "amount": amount, "currency": "INR"}
+                        for amount in order_amounts
+                    ]
+                },
+                timeout=5.0
+            )
         
         print("\n=== Final state ===")
-        wallet = (await self._request("GET", f"/wallet/{self.customer_id}", timeout=10.0)).json()
+        wallet = (await self._request("GET", self.wallet_path, timeout=10.0)).json()
         print(f"Wallet balance: {wallet['balance']}")
         
         orders = (await self._request("GET", "/orders", params={"customer_id": self.customer_id}, timeout=10.0)).json()
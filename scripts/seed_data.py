@@ -1,18 +1,103 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import base64
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import os
+from pathlib import Path
+import queue
+import sys
+import time
 
 import httpx
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional and not available on Windows
+    uvloop = None
 
 BASE_URL = "http://localhost:8000/api"
 DEFAULT_PASSWORD = "password123"
+SEED_CONCURRENCY = 8
+# Tokens from earlier runs, keyed by "<base_url> <user_id>"; reused until shortly before they expire.
+TOKEN_CACHE_PATH = Path.home() / ".cache" / "payment-seed" / "tokens.json"
+TOKEN_MIN_TTL_SECONDS = 60
+# HTTP/2 is negotiated via ALPN on https origins; plain-http servers keep using pooled HTTP/1.1 connections.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
 
 
 def _json_or_text(response: httpx.Response):
-    try:
+    if "application/json" in response.headers.get("content-type", ""):
         return response.json()
-    except ValueError:
-        return response.text
+    return response.text
+
+
+# Coroutines only enqueue records; a background thread does the stdout writes.
+logger = logging.getLogger("seed")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue: queue.Queue = queue.Queue(-1)
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+
+def _register_body(user_id: str, email: str, full_name: str, phone: str | None, password: str) -> bytes:
+    return orjson.dumps(
+        {"user_id": user_id, "email": email, "full_name": full_name, "phone": phone, "password": password}
+    )
+
+
+# The predefined users for --all, each with its registration body serialised once at import.
+SEED_USERS = [
+    (user_id, email, full_name, phone, _register_body(user_id, email, full_name, phone, DEFAULT_PASSWORD))
+    for user_id, email, full_name, phone in (
+        ("CUST-001", "john.doe@example.com", "John Doe", "+91-9876543210"),
+        ("CUST-002", "jane.smith@example.com", "Jane Smith", "+91-9876543211"),
+        ("CUST-003", "bob.wilson@example.com", "Bob Wilson", "+91-9876543212"),
+    )
+]
+
+_token_cache: dict[str, str] | None = None
+
+
+def _load_token_cache() -> dict[str, str]:
+    global _token_cache
+    if _token_cache is None:
+        try:
+            cached = json.loads(TOKEN_CACHE_PATH.read_text())
+        except (OSError, ValueError):
+            cached = None
+        # A truncated or hand-edited file is treated as empty rather than crashing the seeder.
+        if not isinstance(cached, dict):
+            cached = {}
+        _token_cache = {key: token for key, token in cached.items() if isinstance(token, str)}
+    return _token_cache
+
+
+def _save_token_cache():
+    # The file holds live bearer tokens, so it is readable by the current user only.
+    try:
+        TOKEN_CACHE_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+            json.dump(_load_token_cache(), cache_file)
+        os.chmod(TOKEN_CACHE_PATH, 0o600)
+    except OSError:
+        pass
+
+
+def _token_expiry(token: str) -> int:
+    try:
+        payload = token.split(".")[1]
+        return int(json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0
 
 
 def normalize_base_url(base_url: str) -> str:
@@ -27,31 +112,26 @@ async def seed_user(
     full_name: str,
     phone: str | None = None,
     password: str = DEFAULT_PASSWORD,
+    body: bytes | None = None,
 ) -> bool:
     """Create a user (or proceed if already present)."""
-    print(f"Creating user {user_id}...")
+    logger.info("Creating user %s...", user_id)
 
     response = await client.post(
         "/auth/register",
-        json={
-            "user_id": user_id,
-            "email": email,
-            "full_name": full_name,
-            "phone": phone,
-            "password": password,
-        },
+        content=body or _register_body(user_id, email, full_name, phone, password),
+        headers=JSON_HEADERS,
     )
 
     if response.status_code == 201:
         data = response.json()
-        print(f"OK User created: {data['user_id']} - {data['full_name']} ({data['email']})")
+        logger.info("OK User created: %s - %s (%s)", data["user_id"], data["full_name"], data["email"])
         return True
     if response.status_code == 400:
-        print(f"OK User {user_id} already exists")
+        logger.info("OK User %s already exists", user_id)
         return True
 
-    print(f"X Failed to create user: {response.status_code}")
-    print(f"  {_json_or_text(response)}")
+    logger.error("X Failed to create user: %s\n  %s", response.status_code, _json_or_text(response))
     return False
 
 
@@ -59,8 +139,19 @@ async def login_user(
     client: httpx.AsyncClient,
     user_id: str,
     password: str = DEFAULT_PASSWORD,
+    use_cache: bool = True,
 ) -> dict[str, str] | None:
-    """Login and return auth headers."""
+    """Login and return auth headers, reusing a cached token while it is still valid."""
+    cache = _load_token_cache()
+    cache_key = f"{client.base_url} {user_id}"
+    if not use_cache:
+        # The server rejected the cached token (revoked, or signed with an old SECRET_KEY).
+        if cache.pop(cache_key, None) is not None:
+            _save_token_cache()
+    token = cache.get(cache_key)
+    if token and _token_expiry(token) - time.time() > TOKEN_MIN_TTL_SECONDS:
+        return {"Authorization": f"Bearer {token}"}
+
     response = await client.post(
         "/auth/login",
         json={"user_id": user_id, "password": password},
@@ -68,13 +159,36 @@ async def login_user(
     if response.status_code == 200:
         token = response.json().get("access_token")
         if token:
+            cache[cache_key] = token
+            _save_token_cache()
             return {"Authorization": f"Bearer {token}"}
 
-    print(f"X Failed to login user {user_id}: {response.status_code}")
-    print(f"  {_json_or_text(response)}")
+    logger.error("X Failed to login user %s: %s\n  %s", user_id, response.status_code, _json_or_text(response))
     return None
 
 
+async def _authed_post(
+    client: httpx.AsyncClient,
+    user_id: str,
+    headers: dict[str, str],
+    url: str,
+    extra_headers: dict[str, str] | None = None,
+    **kwargs,
+) -> httpx.Response:
+    """POST with the user's token; on a 401, log in again without the cache and retry once."""
+    response = await client.post(url, headers={**headers, **(extra_headers or {})}, **kwargs)
+    if response.status_code != 401:
+        return response
+
+    logger.info("Token for %s was rejected, logging in again...", user_id)
+    fresh_headers = await login_user(client, user_id, use_cache=False)
+    if not fresh_headers:
+        return response
+    # Later calls share this dict, so they pick up the new token too.
+    headers.update(fresh_headers)
+    return await client.post(url, headers={**headers, **(extra_headers or {})}, **kwargs)
+
+
 async def seed_wallet(
     client: httpx.AsyncClient,
     customer_id: str,
@@ -82,21 +196,22 @@ async def seed_wallet(
     initial_balance: float = 1000.0,
 ) -> bool:
     """Initialize a wallet with starting balance."""
-    print(f"Seeding wallet for {customer_id} with balance {initial_balance}...")
+    logger.info("Seeding wallet for %s with balance %s...", customer_id, initial_balance)
 
-    response = await client.post(
+    response = await _authed_post(
+        client,
+        customer_id,
+        headers,
         f"/wallet/{customer_id}/credit",
         json={"amount": initial_balance},
-        headers=headers,
     )
 
     if response.status_code == 200:
         data = response.json()
-        print(f"OK Wallet updated: {data['customer_id']} - Balance: {data['balance']}")
+        logger.info("OK Wallet updated: %s - Balance: %s", data["customer_id"], data["balance"])
         return True
 
-    print(f"X Failed to update wallet: {response.status_code}")
-    print(f"  {_json_or_text(response)}")
+    logger.error("X Failed to update wallet: %s\n  %s", response.status_code, _json_or_text(response))
     return False
 
 
@@ -107,50 +222,69 @@ async def seed_orders(
     count: int = 3,
 ):
     """Create sample orders."""
-    print(f"\nCreating {count} sample orders for {customer_id}...")
-
-    for i in range(count):
-        amount = 100.0 + (i * 50)
-        response = await client.post(
-            "/orders",
-            json={
-                "customer_id": customer_id,
-                "amount": amount,
-                "currency": "INR",
-                "idempotency_key": f"seed-order-{customer_id}-{i}",
-            },
-            headers=headers,
-            timeout=10.0,
-        )
+    logger.info("\nCreating %d sample orders for %s...", count, customer_id)
+
+    orders = [
+        {
+            "customer_id": customer_id,
+            "amount": 100.0 + (i * 50),
+            "currency": "INR",
+            "idempotency_key": f"seed-order-{customer_id}-{i}",
+        }
+        for i in range(count)
+    ]
+
+    response = await _authed_post(
+        client, customer_id, headers, "/orders/batch", JSON_HEADERS, content=orjson.dumps({"orders": orders})
+    )
+    if response.status_code == 201:
+        for data in response.json():
+            logger.info("OK Order created: %s", data["order_id"])
+        return
+    if response.status_code not in (404, 405):
+        logger.error("X Failed to create orders: %s\n  %s", response.status_code, _json_or_text(response))
+        return
+
+    # Older servers have no batch endpoint; post the same orders one at a time.
+    async def post_order(order: dict):
+        response = await _authed_post(client, customer_id, headers, "/orders", json=order)
 
         if response.status_code == 201:
             data = response.json()
-            print(f"OK Order created: {data['order_id']}")
+            logger.info("OK Order created: %s", data["order_id"])
         else:
-            print(f"X Failed to create order: {response.status_code}")
-            print(f"  {_json_or_text(response)}")
+            logger.error("X Failed to create order: %s\n  %s", response.status_code, _json_or_text(response))
+
+    await asyncio.gather(*(post_order(order) for order in orders))
+
+
+async def _seed_one(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    user_id: str,
+    email: str,
+    full_name: str,
+    phone: str,
+    body: bytes,
+):
+    async with semaphore:
+        logger.info("\n--- Processing %s ---", user_id)
+        if not await seed_user(client, user_id, email, full_name, phone, body=body):
+            return
+        headers = await login_user(client, user_id)
+        if not headers:
+            return
+        await seed_wallet(client, user_id, headers, 1000.0 + (int(user_id.split("-")[1]) * 500))
+        await seed_orders(client, user_id, headers, 2)
 
 
 async def seed_multiple_users(client: httpx.AsyncClient):
     """Seed multiple users with wallets and orders."""
-    users = [
-        ("CUST-001", "john.doe@example.com", "John Doe", "+91-9876543210"),
-        ("CUST-002", "jane.smith@example.com", "Jane Smith", "+91-9876543211"),
-        ("CUST-003", "bob.wilson@example.com", "Bob Wilson", "+91-9876543212"),
-    ]
+    logger.info("%s\nSeeding multiple users\n%s", "=" * 60, "=" * 60)
 
-    print("=" * 60)
-    print("Seeding multiple users")
-    print("=" * 60)
-
-    for user_id, email, full_name, phone in users:
-        print(f"\n--- Processing {user_id} ---")
-        if await seed_user(client, user_id, email, full_name, phone):
-            headers = await login_user(client, user_id)
-            if not headers:
-                continue
-            await seed_wallet(client, user_id, headers, 1000.0 + (int(user_id.split("-")[1]) * 500))
-            await seed_orders(client, user_id, headers, 2)
+    # Users are independent, so they are seeded concurrently over the shared client's connection pool.
+    semaphore = asyncio.Semaphore(SEED_CONCURRENCY)
+    await asyncio.gather(*(_seed_one(client, semaphore, *user) for user in SEED_USERS))
 
 
 async def main():
@@ -164,7 +298,9 @@ async def main():
 
     base_url = normalize_base_url(args.base_url)
 
-    async with httpx.AsyncClient(base_url=base_url) as client:
+    async with httpx.AsyncClient(
+        base_url=base_url, http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+    ) as client:
         if args.all:
             await seed_multiple_users(client)
             return
@@ -173,7 +309,7 @@ async def main():
         email = args.email or f"{customer_id.lower()}@example.com"
         full_name = args.full_name
 
-        print(f"Starting data seeding for customer: {customer_id}\n")
+        logger.info("Starting data seeding for customer: %s\n", customer_id)
 
         if await seed_user(client, customer_id, email, full_name, "+91-9876543210"):
             headers = await login_user(client, customer_id)
@@ -181,8 +317,15 @@ async def main():
                 await seed_wallet(client, customer_id, headers, 1000.0)
                 await seed_orders(client, customer_id, headers, 3)
 
-        print("\nOK Seeding complete!")
+        logger.info("\nOK Seeding complete!")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    _log_listener.start()
+    try:
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
+    finally:
+        _log_listener.stop()
\ No newline at end of file
@@ -27,7 +27,7 @@ CREATE INDEX idx_users_created_at ON users(created_at DESC);
 -- Create wallets table
 CREATE TABLE wallets (
     customer_id VARCHAR(100) PRIMARY KEY,
-    balance NUMERIC(10, 2) NOT NULL DEFAULT 0,
+    balance NUMERIC(18, 2) NOT NULL DEFAULT 0,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_wallet_user FOREIGN KEY (customer_id) REFERENCES users(user_id) ON DELETE CASCADE,
     CONSTRAINT check_wallet_balance_non_negative CHECK (balance >= 0)
@@ -38,7 +38,7 @@ CREATE INDEX idx_wallets_updated_at ON wallets(updated_at DESC);
 
 -- Create orders table
 CREATE TABLE orders (
-    id VARCHAR(36) PRIMARY KEY,
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     customer_id VARCHAR(100) NOT NULL,
     amount NUMERIC(10, 2) NOT NULL,
     currency VARCHAR(3) NOT NULL DEFAULT 'INR',
@@ -53,7 +53,7 @@ CREATE TABLE orders (
 CREATE INDEX idx_orders_customer_id ON orders(customer_id);
 CREATE INDEX idx_orders_created_at ON orders(created_at DESC);
 CREATE INDEX idx_orders_status ON orders(status);
-CREATE INDEX idx_orders_idempotency_key ON orders(idempotency_key);
+CREATE UNIQUE INDEX idx_orders_idempotency_key ON orders(idempotency_key) WHERE idempotency_key IS NOT NULL;
 
 -- Add comments for documentation
 COMMENT ON TABLE users IS 'Stores customer/user information';
@@ -0,0 +1,39 @@
+-- Payment API Schema Upgrade
+-- PostgreSQL 16+
+-- Database: appdb
+--
+-- Brings a database created from an earlier sql/schema.sql up to date.
+-- python -m app.init_db only creates missing tables, so it does not apply these changes.
+-- Run once per database, while the API is stopped:
+--   docker exec -i app_pg psql -U postgres -d appdb -v ON_ERROR_STOP=1 < sql/upgrade_existing_db.sql
+
+BEGIN;
+
+-- Keep the oldest order for each idempotency key and clear the key on later duplicates,
+-- so the unique index below can be built without deleting any orders
+UPDATE orders
+SET idempotency_key = NULL
+WHERE id IN (
+    SELECT id
+    FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (PARTITION BY idempotency_key ORDER BY created_at, id) AS rn
+        FROM orders
+        WHERE idempotency_key IS NOT NULL
+    ) ranked
+    WHERE ranked.rn > 1
+);
+
+-- Replace the plain idempotency index with the unique partial index that
+-- INSERT ... ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL relies on
+DROP INDEX IF EXISTS idx_orders_idempotency_key;
+CREATE UNIQUE INDEX idx_orders_idempotency_key ON orders(idempotency_key) WHERE idempotency_key IS NOT NULL;
+
+-- Store order ids as native UUIDs generated by the database
+ALTER TABLE orders ALTER COLUMN id TYPE UUID USING id::uuid;
+ALTER TABLE orders ALTER COLUMN id SET DEFAULT gen_random_uuid();
+
+-- Widen wallet balances so large totals do not overflow
+ALTER TABLE wallets ALTER COLUMN balance TYPE NUMERIC(18, 2);
+
+COMMIT;
@@ -0,0 +1,105 @@
+import os
+
+from fastapi import Depends
+import httpx
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["SECRET_KEY"] = "test-secret-key-please-change-to-32-bytes"
+# bcrypt's minimum cost keeps register/login fast in tests; production keeps the configured BCRYPT_ROUNDS.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from app.db import Base, engine, get_db, get_read_db
+from app.main import app
+
+
+# pysqlite defers BEGIN and lets SAVEPOINT run outside a transaction; take over BEGIN so savepoints nest
+# inside the per-test transaction instead of committing it.
+@event.listens_for(engine.sync_engine, "connect")
+def _disable_pysqlite_begin(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+async def _create_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def _client():
+    # ASGITransport does not send lifespan events, so the app's lifespan is entered here.
+    async with app.router.lifespan_context(app):
+        await _create_schema()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as test_client:
+            yield test_client
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def db_connection(_client: httpx.AsyncClient):
+    """The test's connection, inside one outer transaction that is rolled back afterwards."""
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            yield conn
+        finally:
+            await trans.rollback()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def client(_client: httpx.AsyncClient, db_connection):
+    # Request sessions join the test's transaction; the services' commits and rollbacks only release
+    # or roll back SAVEPOINTs inside it, so nothing outlives the test.
+    async def _get_test_db():
+        async with AsyncSession(
+            bind=db_connection,
+            join_transaction_mode="create_savepoint",
+            autoflush=False,
+            expire_on_commit=False,
+        ) as db:
+            yield db
+
+    async def _get_test_read_db(db: AsyncSession = Depends(get_db)):
+        # One session per request, so reads and writes do not unwind each other's savepoints.
+        return db
+
+    app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_read_db] = _get_test_read_db
+    yield _client
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def make_user(client: httpx.AsyncClient):
+    """Register and log in a user, returning auth headers; repeated calls in a test reuse them."""
+    created = {}
+
+    async def _make(user_id: str, email: str | None = None, password: str = "password123"):
+        if user_id in created:
+            return created[user_id]
+
+        register = await client.post(
+            "/api/auth/register",
+            json={
+                "user_id": user_id,
+                "email": email or f"{user_id.lower()}@example.com",
+                "full_name": f"Customer {user_id}",
+                "phone": "+15550000000",
+                "password": password,
+            },
+        )
+        assert register.status_code == 201, register.text
+
+        login = await client.post("/api/auth/login", json={"user_id": user_id, "password": password})
+        assert login.status_code == 200, login.text
+        created[user_id] = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        return created[user_id]
+
+    return _make
@@ -1,34 +1,41 @@
-import os
-
+from datetime import timedelta
+from decimal import Decimal
+import time
+
+import bcrypt
+from cachetools import TLRUCache
+import httpx
+import jwt
 import pytest
-from fastapi.testclient import TestClient
-
-os.environ["DATABASE_URL"] = "sqlite:///./test_api.db"
-os.environ["SECRET_KEY"] = "test-secret-key-please-change"
-
-from app.db import Base, engine
-from app.main import app
-
-
-@pytest.fixture()
-def client():
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    with TestClient(app) as test_client:
-        yield test_client
-
-
-def test_health_and_info_endpoints(client: TestClient):
-    health = client.get("/")
+from sqlalchemy import inspect, select, update
+
+from app import security, services
+from app.config import settings
+from app.models import User, Wallet
+from app.security import (
+    DUMMY_PASSWORD_HASH,
+    _load_jwt_signer,
+    create_access_token,
+    get_password_hash,
+    verify_password,
+    verify_token,
+)
+
+# Every test shares the session's event loop, which owns the in-memory database connection.
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+
+async def test_health_and_info_endpoints(client: httpx.AsyncClient):
+    health = await client.get("/")
     assert health.status_code == 200
     assert health.json()["status"] == "healthy"
 
-    info = client.get("/api")
+    info = await client.get("/api")
     assert info.status_code == 200
     assert "auth" in info.json()
 
 
-def test_auth_register_login_flow(client: TestClient):
+async def test_auth_register_login_flow(client: httpx.AsyncClient):
     register_payload = {
         "user_id": "CUST-001",
         "email": "cust1@example.com",
@@ -37,10 +44,10 @@ def test_auth_register_login_flow(client: TestClient):
         "password": "password123",
     }
 
-    register = client.post("/api/auth/register", json=register_payload)
+    register = await client.post("/api/auth/register", json=register_payload)
     assert register.status_code == 201, register.text
 
-    login = client.post(
+    login = await client.post(
         "/api/auth/login",
         json={"email": "cust1@example.com", "password": "password123"},
     )
@@ -48,7 +55,93 @@ def test_auth_register_login_flow(client: TestClient):
     assert "access_token" in login.json()
 
 
-def test_auth_invalid_login_and_duplicate_registration(client: TestClient):
+async def test_auth_logout_revokes_token(client: httpx.AsyncClient, make_user):
+    headers = await make_user("CUST-011", "cust11@example.com")
+
+    assert (await client.get("/api/users/CUST-011", headers=headers)).status_code == 200
+
+    logout = await client.post("/api/auth/logout", headers=headers)
+    assert logout.status_code == 204
+
+    revoked = await client.get("/api/users/CUST-011", headers=headers)
+    assert revoked.status_code == 401
+    assert revoked.json()["detail"] == "Token has been revoked"
+
+
+async def test_access_token_decodes_with_pyjwt():
+    token = create_access_token({"sub": "CUST-012"})
+    assert jwt.get_unverified_header(token) == {"alg": settings.ALGORITHM, "typ": "JWT"}
+
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert claims["sub"] == "CUST-012"
+    assert claims["type"] == "access"
+    assert isinstance(claims["exp"], int)
+    assert 0 < claims["exp"] - time.time() <= settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    assert len(claims["jti"]) == 32
+    assert create_access_token({"sub": "CUST-012"}) != token
+
+
+async def test_non_hmac_jwt_algorithm_is_rejected():
+    with pytest.raises(ValueError, match="ALGORITHM"):
+        _load_jwt_signer("RS256", settings.SECRET_KEY)
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """Count the signature checks verify_token falls through to on a cache miss."""
+    calls = []
+    decode = security._decode_token
+
+    def _counting_decode(token):
+        calls.append(token)
+        return decode(token)
+
+    monkeypatch.setattr(security, "_decode_token", _counting_decode)
+    return calls
+
+
+async def test_tampered_token_is_rejected_and_not_cached(decode_calls):
+    token = create_access_token({"sub": "CUST-013"})
+    header, payload, signature = token.split(".")
+    tampered = ".".join((header, payload, ("A" if signature[0] != "A" else "B") + signature[1:]))
+
+    assert verify_token(tampered) is None
+    assert verify_token(tampered) is None
+    assert decode_calls == [tampered, tampered]
+
+    assert verify_token(token).user_id == "CUST-013"
+    assert verify_token(token).user_id == "CUST-013"
+    assert decode_calls == [tampered, tampered, token]
+
+
+async def test_cached_token_is_not_served_after_exp(monkeypatch, decode_calls):
+    clock = [time.time()]
+    cache = TLRUCache(maxsize=16, ttu=security._token_cache.ttu, timer=lambda: clock[0])
+    monkeypatch.setattr(security, "_token_cache", cache)
+    token = create_access_token({"sub": "CUST-014"}, expires_delta=timedelta(minutes=1))
+
+    verify_token(token)
+    verify_token(token)
+    assert len(decode_calls) == 1
+
+    clock[0] += 120
+    verify_token(token)
+    assert len(decode_calls) == 2
+
+
+async def test_create_user_evicts_cached_auth_user(client: httpx.AsyncClient, make_user):
+    # A stale snapshot, e.g. from a user row that was deleted and is now registered again.
+    services._auth_user_cache["CUST-015"] = services.AuthUser(user_id="CUST-015", is_active=False)
+
+    headers = await make_user("CUST-015")
+    assert "CUST-015" not in services._auth_user_cache
+
+    response = await client.get("/api/users/CUST-015", headers=headers)
+    assert response.status_code == 200
+    assert services._auth_user_cache["CUST-015"].is_active is True
+
+
+async def test_auth_invalid_login_and_duplicate_registration(client: httpx.AsyncClient):
     payload = {
         "user_id": "CUST-010",
         "email": "cust10@example.com",
@@ -56,14 +149,18 @@ def test_auth_invalid_login_and_duplicate_registration(client: TestClient):
         "phone": "+15550000010",
         "password": "password123",
     }
-    register = client.post("/api/auth/register", json=payload)
+    register = await client.post("/api/auth/register", json=payload)
     assert register.status_code == 201, register.text
 
-    duplicate = client.post("/api/auth/register", json=payload)
+    duplicate = await client.post("/api/auth/register", json=payload)
     assert duplicate.status_code == 400
     assert duplicate.json()["detail"] == "User already exists"
 
-    invalid_login = client.post(
+    duplicate_email = await client.post("/api/auth/register", json={**payload, "user_id": "CUST-099"})
+    assert duplicate_email.status_code == 400
+    assert duplicate_email.json()["detail"] == "User already exists"
+
+    invalid_login = await client.post(
         "/api/auth/login",
         json={"email": "cust10@example.com", "password": "wrong-password"},
     )
@@ -71,46 +168,45 @@ def test_auth_invalid_login_and_duplicate_registration(client: TestClient):
     assert invalid_login.json()["detail"] == "Invalid credentials"
 
 
-def test_auth_required_for_protected_endpoints(client: TestClient):
-    users = client.get("/api/users")
+async def test_login_with_unknown_user_still_checks_a_password_hash(client: httpx.AsyncClient, monkeypatch):
+    checked_hashes = []
+    real_verify = services.verify_password_async
+
+    async def _recording_verify(plain_password, hashed_password):
+        checked_hashes.append(hashed_password)
+        return await real_verify(plain_password, hashed_password)
+
+    monkeypatch.setattr(services, "verify_password_async", _recording_verify)
+
+    login = await client.post("/api/auth/login", json={"user_id": "CUST-404", "password": "password123"})
+    assert login.status_code == 401
+    assert checked_hashes == [DUMMY_PASSWORD_HASH]
+
+
+async def test_auth_required_for_protected_endpoints(client: httpx.AsyncClient):
+    users = await client.get("/api/users")
     assert users.status_code == 401
     assert users.headers["www-authenticate"] == "Bearer"
     assert "Authentication required" in users.json()["detail"]
 
-    orders = client.get("/api/orders", params={"customer_id": "CUST-001"})
+    orders = await client.get("/api/orders", params={"customer_id": "CUST-001"})
     assert orders.status_code == 401
 
-    wallet = client.get("/api/wallet/CUST-001")
+    wallet = await client.get("/api/wallet/CUST-001")
     assert wallet.status_code == 401
 
 
-def test_users_orders_wallet_endpoints(client: TestClient):
-    register_payload = {
-        "user_id": "CUST-002",
-        "email": "cust2@example.com",
-        "full_name": "Customer Two",
-        "phone": "+15550000002",
-        "password": "password123",
-    }
-    register = client.post("/api/auth/register", json=register_payload)
-    assert register.status_code == 201, register.text
-
-    login = client.post(
-        "/api/auth/login",
-        json={"email": "cust2@example.com", "password": "password123"},
-    )
-    assert login.status_code == 200, login.text
-    token = login.json()["access_token"]
-    headers = {"Authorization": f"Bearer {token}"}
+async def test_users_orders_wallet_endpoints(client: httpx.AsyncClient, make_user):
+    headers = await make_user("CUST-002", "cust2@example.com")
 
-    users = client.get("/api/users", headers=headers)
+    users = await client.get("/api/users", headers=headers)
     assert users.status_code == 200
     assert len(users.json()) == 1
 
-    user = client.get("/api/users/CUST-002", headers=headers)
+    user = await client.get("/api/users/CUST-002", headers=headers)
     assert user.status_code == 200
 
-    order = client.post(
+    order = await client.post(
         "/api/orders",
         headers=headers,
         json={
@@ -122,11 +218,11 @@ def test_users_orders_wallet_endpoints(client: TestClient):
     )
     assert order.status_code == 201, order.text
 
-    orders = client.get("/api/orders", headers=headers, params={"customer_id": "CUST-002"})
+    orders = await client.get("/api/orders", headers=headers, params={"customer_id": "CUST-002"})
     assert orders.status_code == 200
     assert len(orders.json()) == 1
 
-    credit = client.post(
+    credit = await client.post(
         "/api/wallet/CUST-002/credit",
         headers=headers,
         json={"amount": 200},
@@ -134,7 +230,7 @@ def test_users_orders_wallet_endpoints(client: TestClient):
     assert credit.status_code == 200
     assert credit.json()["balance"] == 200.0
 
-    debit = client.post(
+    debit = await client.post(
         "/api/wallet/CUST-002/debit",
         headers=headers,
         json={"amount": 50},
@@ -142,29 +238,13 @@ def test_users_orders_wallet_endpoints(client: TestClient):
     assert debit.status_code == 200
     assert debit.json()["balance"] == 150.0
 
-    wallet = client.get("/api/wallet/CUST-002", headers=headers)
+    wallet = await client.get("/api/wallet/CUST-002", headers=headers)
     assert wallet.status_code == 200
     assert wallet.json()["balance"] == 150.0
 
 
-def test_order_idempotency_and_wallet_insufficient_balance(client: TestClient):
-    register_payload = {
-        "user_id": "CUST-005",
-        "email": "cust5@example.com",
-        "full_name": "Customer Five",
-        "phone": "+15550000005",
-        "password": "password123",
-    }
-    register = client.post("/api/auth/register", json=register_payload)
-    assert register.status_code == 201, register.text
-
-    login = client.post(
-        "/api/auth/login",
-        json={"email": "cust5@example.com", "password": "password123"},
-    )
-    assert login.status_code == 200, login.text
-    token = login.json()["access_token"]
-    headers = {"Authorization": f"Bearer {token}"}
+async def test_order_idempotency_and_wallet_insufficient_balance(client: httpx.AsyncClient, make_user):
+    headers = await make_user("CUST-005", "cust5@example.com")
 
     payload = {
         "customer_id": "CUST-005",
@@ -172,13 +252,41 @@ def test_order_idempotency_and_wallet_insufficient_balance(client: TestClient):
         "currency": "INR",
         "idempotency_key": "idem-xyz",
     }
-    first = client.post("/api/orders", headers=headers, json=payload)
+    first = await client.post("/api/orders", headers=headers, json=payload)
     assert first.status_code == 201, first.text
-    second = client.post("/api/orders", headers=headers, json=payload)
+    second = await client.post("/api/orders", headers=headers, json=payload)
     assert second.status_code == 201, second.text
     assert first.json()["order_id"] == second.json()["order_id"]
 
-    debit = client.post(
+    orders = await client.get("/api/orders", headers=headers, params={"customer_id": "CUST-005"})
+    assert orders.status_code == 200, orders.text
+    assert len(orders.json()) == 1
+
+    page = await client.get(
+        "/api/orders", headers=headers, params={"customer_id": "CUST-005", "skip": 1, "limit": 10}
+    )
+    assert page.status_code == 200, page.text
+    assert page.json() == []
+
+    batch = await client.post(
+        "/api/orders/batch",
+        headers=headers,
+        json={
+            "orders": [
+                payload,
+                {"customer_id": "CUST-005", "amount": 20.0, "currency": "INR"},
+                {"customer_id": "CUST-005", "amount": 30.0, "currency": "INR", "idempotency_key": "idem-b"},
+            ]
+        },
+    )
+    assert batch.status_code == 201, batch.text
+    assert batch.json()[0]["order_id"] == first.json()["order_id"]
+    assert len({order["order_id"] for order in batch.json()}) == 3
+
+    orders = await client.get("/api/orders", headers=headers, params={"customer_id": "CUST-005"})
+    assert len(orders.json()) == 3
+
+    debit = await client.post(
         "/api/wallet/CUST-005/debit",
         headers=headers,
         json={"amount": 1},
@@ -187,42 +295,82 @@ def test_order_idempotency_and_wallet_insufficient_balance(client: TestClient):
     assert debit.json()["detail"] == "Insufficient wallet balance"
 
 
-def test_forbidden_cross_customer_access(client: TestClient):
-    register_a = client.post(
-        "/api/auth/register",
-        json={
-            "user_id": "CUST-003",
-            "email": "cust3@example.com",
-            "full_name": "Customer Three",
-            "phone": "+15550000003",
-            "password": "password123",
-        },
-    )
-    assert register_a.status_code == 201, register_a.text
+async def test_wallet_credit_and_debit_keep_exact_decimal_balance(
+    client: httpx.AsyncClient, make_user, db_connection
+):
+    headers = await make_user("CUST-007", "cust7@example.com")
+    balance = select(Wallet.balance).where(Wallet.customer_id == "CUST-007")
 
-    register_b = client.post(
-        "/api/auth/register",
-        json={
-            "user_id": "CUST-004",
-            "email": "cust4@example.com",
-            "full_name": "Customer Four",
-            "phone": "+15550000004",
-            "password": "password123",
-        },
-    )
-    assert register_b.status_code == 201, register_b.text
+    for amount in ("0.10", "0.20"):
+        credit = await client.post("/api/wallet/CUST-007/credit", headers=headers, json={"amount": amount})
+        assert credit.status_code == 200, credit.text
+    assert await db_connection.scalar(balance) == Decimal("0.30")
 
-    login = client.post(
-        "/api/auth/login",
-        json={"email": "cust3@example.com", "password": "password123"},
-    )
+    debit = await client.post("/api/wallet/CUST-007/debit", headers=headers, json={"amount": "0.30"})
+    assert debit.status_code == 200, debit.text
+    assert debit.json()["balance"] == 0
+    assert await db_connection.scalar(balance) == Decimal("0.00")
+
+
+async def test_wallet_debit_up_to_balance_and_no_further(client: httpx.AsyncClient, make_user, db_connection):
+    headers = await make_user("CUST-008", "cust8@example.com")
+    balance = select(Wallet.balance).where(Wallet.customer_id == "CUST-008")
+
+    credit = await client.post("/api/wallet/CUST-008/credit", headers=headers, json={"amount": "50.00"})
+    assert credit.status_code == 200, credit.text
+
+    exact = await client.post("/api/wallet/CUST-008/debit", headers=headers, json={"amount": "50.00"})
+    assert exact.status_code == 200, exact.text
+    assert await db_connection.scalar(balance) == Decimal("0.00")
+
+    top_up = await client.post("/api/wallet/CUST-008/credit", headers=headers, json={"amount": "10.00"})
+    assert top_up.status_code == 200, top_up.text
+    over = await client.post("/api/wallet/CUST-008/debit", headers=headers, json={"amount": "10.01"})
+    assert over.status_code == 400
+    assert over.json()["detail"] == "Insufficient wallet balance"
+    assert await db_connection.scalar(balance) == Decimal("10.00")
+
+
+async def test_login_upgrades_password_hash_to_configured_cost(
+    client: httpx.AsyncClient, make_user, db_connection
+):
+    await make_user("CUST-006", "cust6@example.com")
+    stored_hash = select(User.hashed_password).where(User.user_id == "CUST-006")
+    assert (await db_connection.scalar(stored_hash)).startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+
+    old_hash = bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS + 1)).decode("utf-8")
+    await db_connection.execute(update(User).where(User.user_id == "CUST-006").values(hashed_password=old_hash))
+
+    login = await client.post("/api/auth/login", json={"user_id": "CUST-006", "password": "password123"})
     assert login.status_code == 200, login.text
-    token = login.json()["access_token"]
-    headers = {"Authorization": f"Bearer {token}"}
 
-    forbidden_order = client.post(
+    upgraded = await db_connection.scalar(stored_hash)
+    assert upgraded != old_hash
+    assert upgraded.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert verify_password("password123", upgraded)
+
+
+async def test_password_pepper_is_required_to_verify(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_PEPPER", "pepper")
+    peppered = get_password_hash("password123")
+    assert verify_password("password123", peppered)
+
+    monkeypatch.setattr(settings, "PASSWORD_PEPPER", "")
+    assert not verify_password("password123", peppered)
+
+
+async def test_forbidden_cross_customer_access(client: httpx.AsyncClient, make_user):
+    headers = await make_user("CUST-003", "cust3@example.com")
+    await make_user("CUST-004", "cust4@example.com")
+
+    forbidden_order = await client.post(
         "/api/orders",
         headers=headers,
         json={"customer_id": "CUST-004", "amount": 10, "currency": "INR"},
     )
     assert forbidden_order.status_code == 403
+
+
+async def test_orders_customer_id_is_indexed(db_connection):
+    indexes = await db_connection.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("orders"))
+    assert "idx_orders_customer_id" in {index["name"] for index in indexes}